@@ -2,53 +2,139 @@
 Configuration settings for the posture detector application.
 """
 
+import platform
+from dataclasses import dataclass
+from types import MappingProxyType
+
+
+@dataclass(frozen=True, slots=True)
+class BodyComponent:
+    """Names of the analysis result fields tracked for a body component"""
+
+    parameter: str
+    score: str
+
+
 # Camera settings
 DEFAULT_CAMERA_WIDTH = 640
 DEFAULT_CAMERA_HEIGHT = 480
 
+# MediaPipe pose model complexity: the heavy model (2) is too slow for a Raspberry Pi CPU,
+# so ARM boards default to the full (1, 64-bit) or lite (0, 32-bit) model
+_MACHINE = platform.machine()
+if _MACHINE.startswith("armv7"):
+    DEFAULT_MODEL_COMPLEXITY = 0
+elif _MACHINE in ("aarch64", "arm64"):
+    DEFAULT_MODEL_COMPLEXITY = 1
+else:
+    DEFAULT_MODEL_COMPLEXITY = 2
+
+# The pose model is switched to the next lighter complexity when MediaPipe takes longer than this
+# on average (seconds), measured over POSE_LATENCY_FRAMES inferences
+MAX_POSE_LATENCY = 0.2
+POSE_LATENCY_FRAMES = 30
+
+# Frames wider than this are downscaled (keeping the aspect ratio) before pose detection
+INFERENCE_MAX_WIDTH = 480
+
+# Pose detection runs on one camera frame out of this many, the frames in between reuse its results
+INFER_EVERY_N_FRAMES = 2
+
+# Pose detection is skipped when the mean absolute difference of a 16x16 thumbnail
+# from the last processed frame is below this (0-255 scale)
+FRAME_DIFF_THRESHOLD = 2
+# ...but pose detection still runs at least this often (seconds), so a slow slouch that barely
+# changes the thumbnail is not missed
+FRAME_DIFF_MAX_AGE = 1.0
+
 # Score thresholds
-NECK_SCORE_MAP = {0: 100, 25: 75, 40: 20, 50: 0}
+NECK_SCORE_MAP = MappingProxyType({0: 100, 25: 75, 40: 20, 50: 0})
+
+TORSO_SCORE_MAP = MappingProxyType({0: 100, 15: 75, 30: 10, 40: 0})
 
-TORSO_SCORE_MAP = {0: 100, 15: 75, 30: 10, 40: 0}
+SHOULDERS_SCORE_MAP = MappingProxyType({0: 100, 100: 50, 200: 0})
 
-SHOULDERS_SCORE_MAP = {0: 100, 100: 50, 200: 0}
+
+def _breakpoints(score_map):
+    """
+    Split a score map into its sorted breakpoints
+
+    Args:
+        score_map: Mapping {x: score}
+
+    Returns:
+        Tuple of (xs, ys) tuples sorted by x
+    """
+    xs, ys = zip(*sorted(score_map.items()))
+    return xs, ys
+
+
+@dataclass(frozen=True, slots=True)
+class PostureConfig:
+    """Sorted (xs, ys) breakpoints of each score map, ready for interpolation"""
+
+    neck_xs: tuple
+    neck_ys: tuple
+    torso_xs: tuple
+    torso_ys: tuple
+    shoulders_xs: tuple
+    shoulders_ys: tuple
+
+    @classmethod
+    def from_score_maps(cls, neck_map, torso_map, shoulders_map):
+        """Build the tables from the neck, torso and shoulders score maps"""
+        neck_xs, neck_ys = _breakpoints(neck_map)
+        torso_xs, torso_ys = _breakpoints(torso_map)
+        shoulders_xs, shoulders_ys = _breakpoints(shoulders_map)
+        return cls(neck_xs, neck_ys, torso_xs, torso_ys, shoulders_xs, shoulders_ys)
+
+
+POSTURE_CONFIG = PostureConfig.from_score_maps(NECK_SCORE_MAP, TORSO_SCORE_MAP, SHOULDERS_SCORE_MAP)
 
 # Warning settings
 WARNING_COOLDOWN = 300  # seconds
 
 # Colors in BGR format
-COLORS = {
-    "blue": (255, 127, 0),
-    "red": (50, 50, 255),
-    "green": (127, 255, 0),
-    "dark_blue": (127, 20, 0),
-    "light_green": (127, 233, 100),
-    "yellow": (0, 255, 255),
-    "pink": (255, 0, 255),
-    "white": (255, 255, 255),
-    "black": (0, 0, 0),
-    "translucent_black": (0, 0, 0, 128),  # For overlay backgrounds
-}
+COLORS = MappingProxyType(
+    {
+        "blue": (255, 127, 0),
+        "red": (50, 50, 255),
+        "green": (127, 255, 0),
+        "dark_blue": (127, 20, 0),
+        "light_green": (127, 233, 100),
+        "yellow": (0, 255, 255),
+        "pink": (255, 0, 255),
+        "white": (255, 255, 255),
+        "black": (0, 0, 0),
+        "translucent_black": (0, 0, 0, 128),  # For overlay backgrounds
+    }
+)
 
 # Font settings
 FONT_FACE = 0  # FONT_HERSHEY_SIMPLEX
 FONT_THICKNESS = 2
 DEFAULT_SENSITIVITY = 75
 
-BODY_COMPONENTS = {
-    "neck": {"parameter": "neck_angle", "score": "neck_score"},
-    "torso": {"parameter": "torso_angle", "score": "torso_score"},
-    "shoulders": {"parameter": "shoulders_offset", "score": "shoulders_score"},
-}
+BODY_COMPONENTS = MappingProxyType(
+    {
+        "neck": BodyComponent(parameter="neck_angle", score="neck_score"),
+        "torso": BodyComponent(parameter="torso_angle", score="torso_score"),
+        "shoulders": BodyComponent(parameter="shoulders_offset", score="shoulders_score"),
+    }
+)
 
 ALERT_SLIDING_WINDOW_DURATION = 120  # seconds
 SLIDING_WINDOW_DURATION = 30  # seconds
+PREVIEW_SLIDING_WINDOW_DURATION = 3  # seconds, for the colors of the lines drawn on the webcam preview
 
 SEND_INTERVAL = 30  # seconds
 
 # GPIO
 VIBRATION_PIN = 14
 
+# Maximum rate of webcam preview updates, independent of the analysis frame rate
+UI_MAX_FPS = 15
+
 # Instruction panel settings
 PANEL_PADDING = 10
 PANEL_OPACITY = 0.7
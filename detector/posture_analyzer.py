@@ -2,13 +2,53 @@
 Posture analysis module for detecting posture issues and providing guidance.
 """
 
-import math
-
-from config.settings import (
-    NECK_SCORE_MAP,
-    SHOULDERS_SCORE_MAP,
-    TORSO_SCORE_MAP,
-)
+import functools
+import logging
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from math import atan2, degrees, hypot
+from typing import NamedTuple
+
+from config.settings import POSTURE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class LandmarkSet(NamedTuple):
+    """Key landmarks of a single frame, in pixel coordinates"""
+
+    l_shoulder: tuple[int, int] | None = None
+    r_shoulder: tuple[int, int] | None = None
+    l_ear: tuple[int, int] | None = None
+    r_ear: tuple[int, int] | None = None
+    l_hip: tuple[int, int] | None = None
+    r_hip: tuple[int, int] | None = None
+    primary_ear: str = "left"
+    l_ear_visibility: float = 0
+    r_ear_visibility: float = 0
+    l_hip_visibility: float = 0
+    r_hip_visibility: float = 0
+    l_shoulder_visibility: float = 0
+    r_shoulder_visibility: float = 0
+    is_head_tilted_back: bool = False
+
+
+@dataclass(slots=True)
+class PostureResult:
+    """Results of the posture analysis of a single frame"""
+
+    neck_angle: int | None = None
+    torso_angle: int | None = None
+    shoulders_offset: float | None = None
+    good_posture: bool = False
+    issues: dict = field(default_factory=dict)
+    webcam_position: str | None = None
+    webcam_placement: str = "good"
+    relative_neck_angle: int | None = None
+    is_head_tilted_back: bool = False
+    neck_score: float = 0
+    torso_score: float = 0
+    shoulders_score: float = 0
 
 
 def is_looking_at_camera(landmarks):
@@ -31,7 +71,10 @@ class PostureAnalyzer:
         self.same_side_frames = -1
         self.webcam_position = ""
         self.webcam_placement = "good"
-        pass
+        # Segment of each score map used on the previous frame
+        self._last_idx = {"neck": 1, "torso": 1, "shoulders": 1}
+        # Memoized on the exact landmark coordinates, which repeat while the user holds still
+        self._posture_metrics = functools.lru_cache(maxsize=256)(self._compute_posture_metrics)
 
     def calculate_distance(self, x1, y1, x2, y2):
         """
@@ -44,7 +87,7 @@ class PostureAnalyzer:
         Returns:
             Float: Distance between the points
         """
-        return math.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
+        return hypot(x2 - x1, y2 - y1)
 
     def calculate_angle(self, x1, y1, x2, y2):
         """
@@ -57,85 +100,127 @@ class PostureAnalyzer:
         Returns:
             Integer: Angle in degrees
         """
-        if y1 == y2:  # Avoid division by zero
-            return 90
-
-        # Calculate the angle with respect to vertical
-        theta = math.acos((y2 - y1) * (-y1) / (math.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2) * y1))
-
-        if x2 < x1:
-            theta = -theta
+        # Signed angle between the segment and the upward vertical (image y grows downwards)
+        theta = atan2(x2 - x1, -(y2 - y1))
 
-        return int(180 / math.pi * theta)
+        return int(degrees(theta))
 
-    @staticmethod
-    def compute_score(points_map, x):
+    def compute_score(self, name, xs, ys, x):
         """
-        Interpola linearmente un valore x in base a una mappa di punti {x: y}.
+        Interpola linearmente un valore x in base ai punti (xs, ys) di una mappa di score.
+
+        Le metriche cambiano poco tra un frame e il successivo, quindi il segmento usato
+        al frame precedente (e i suoi vicini) viene provato prima della ricerca binaria.
 
         Args:
-            points_map (dict): Mappa {x: y} con x ordinabili (es. angoli) e y score.
+            name (str): Componente a cui si riferisce la mappa (es. "neck").
+            xs (tuple): Ascisse ordinate della mappa (es. angoli).
+            ys (tuple): Score corrispondenti a ciascuna ascissa.
             x (float): Valore da valutare.
 
         Returns:
             float: Score interpolato.
         """
-        sorted_points = sorted(points_map.items())
-
         # Clamp a valori fuori dai bordi
-        if x <= sorted_points[0][0]:
-            return sorted_points[0][1]
-        if x >= sorted_points[-1][0]:
-            return sorted_points[-1][1]
-
-        # Trova il segmento dove x si trova
-        for i in range(1, len(sorted_points)):
-            x0, y0 = sorted_points[i - 1]
-            x1, y1 = sorted_points[i]
-            if x0 <= x <= x1:
-                t = (x - x0) / (x1 - x0)
-                return y0 + t * (y1 - y0)
+        if x <= xs[0]:
+            return ys[0]
+        if x >= xs[-1]:
+            return ys[-1]
+
+        # Trova il segmento i tale che xs[i - 1] < x <= xs[i]
+        i = self._last_idx[name]
+        if not xs[i - 1] < x <= xs[i]:
+            if i + 1 < len(xs) and xs[i] < x <= xs[i + 1]:
+                i += 1
+            elif i > 1 and xs[i - 2] < x <= xs[i - 1]:
+                i -= 1
+            else:
+                i = bisect_left(xs, x)
+            self._last_idx[name] = i
+
+        x0, x1 = xs[i - 1], xs[i]
+        return ys[i - 1] + (x - x0) * (ys[i] - ys[i - 1]) / (x1 - x0)
+
+    def _compute_posture_metrics(self, l_shoulder, r_shoulder, shoulder, ear, hip):
+        """
+        Compute the posture metrics and scores from the selected landmarks
+
+        Pure function of its arguments, memoized in __init__: a still user produces the
+        same pixel coordinates for many consecutive frames.
+
+        Args:
+            l_shoulder, r_shoulder: Coordinates of both shoulders
+            shoulder, ear, hip: Coordinates of the shoulder, ear and hip on the primary side
+
+        Returns:
+            Tuple: (shoulders_offset, neck_angle, torso_angle, relative_neck_angle,
+                    neck_score, torso_score, shoulders_score)
+        """
+        shoulder_x, shoulder_y = shoulder
+        ear_x, ear_y = ear
+        hip_x, hip_y = hip
+
+        # Calculate shoulder offset
+        shoulders_offset = self.calculate_distance(*l_shoulder, *r_shoulder)
+
+        # Calculate angles
+        neck_angle = self.calculate_angle(shoulder_x, shoulder_y, ear_x, ear_y)
+        torso_angle = self.calculate_angle(hip_x, hip_y, shoulder_x, shoulder_y)
+
+        # Calculate relative angle between neck and torso
+        relative_neck_angle = min(abs(neck_angle - torso_angle), neck_angle)
+
+        # this helps a bit with reclined chairs, otherwise is too aggressive
+        scored_neck_angle = relative_neck_angle
+        if torso_angle <= -30:
+            scored_neck_angle = int(scored_neck_angle / 1.5)
+
+        # compute scores
+        neck_score = self.compute_score("neck", POSTURE_CONFIG.neck_xs, POSTURE_CONFIG.neck_ys, abs(scored_neck_angle))
+        torso_score = self.compute_score("torso", POSTURE_CONFIG.torso_xs, POSTURE_CONFIG.torso_ys, abs(torso_angle))
+        shoulders_score = self.compute_score(
+            "shoulders", POSTURE_CONFIG.shoulders_xs, POSTURE_CONFIG.shoulders_ys, shoulders_offset
+        )
+
+        return (
+            shoulders_offset,
+            neck_angle,
+            torso_angle,
+            relative_neck_angle,
+            neck_score,
+            torso_score,
+            shoulders_score,
+        )
 
     def analyze_posture(self, landmarks, sensitivity=-1):
         """
         Analyze posture based on the landmarks
 
         Args:
-            landmarks: Dictionary of landmark coordinates
+            landmarks: LandmarkSet with the landmark coordinates
 
         Returns:
-            Dictionary: Results of posture analysis
+            PostureResult: Results of posture analysis
         """
-        results = {
-            "neck_angle": None,
-            "torso_angle": None,
-            "shoulders_offset": None,
-            "good_posture": False,
-            "issues": {},
-            "webcam_position": None,
-            "relative_neck_angle": None,
-            "is_head_tilted_back": False,
-            "neck_score": 0,
-            "torso_score": 0,
-        }
+        results = PostureResult()
 
         # Extract key landmarks
-        l_shoulder = landmarks.get("l_shoulder")
-        r_shoulder = landmarks.get("r_shoulder")
-        l_ear = landmarks.get("l_ear")
-        r_ear = landmarks.get("r_ear")
-        l_hip = landmarks.get("l_hip")
-        r_hip = landmarks.get("r_hip")
+        l_shoulder = landmarks.l_shoulder
+        r_shoulder = landmarks.r_shoulder
+        l_ear = landmarks.l_ear
+        r_ear = landmarks.r_ear
+        l_hip = landmarks.l_hip
+        r_hip = landmarks.r_hip
 
         # Get visibility information
-        primary_ear = landmarks.get("primary_ear", "left")  # Default to left if not specified
-        l_ear_vis = landmarks.get("l_ear_visibility", 0)
-        r_ear_vis = landmarks.get("r_ear_visibility", 0)
+        primary_ear = landmarks.primary_ear
+        l_ear_vis = landmarks.l_ear_visibility
+        r_ear_vis = landmarks.r_ear_visibility
 
-        l_hip_vis = landmarks.get("l_hip_visibility", 0)
-        r_hip_vis = landmarks.get("r_hip_visibility", 0)
-        l_shoulder_vis = landmarks.get("l_shoulder_visibility", 0)
-        r_shoulder_vis = landmarks.get("r_shoulder_visibility", 0)
+        l_hip_vis = landmarks.l_hip_visibility
+        r_hip_vis = landmarks.r_hip_visibility
+        l_shoulder_vis = landmarks.l_shoulder_visibility
+        r_shoulder_vis = landmarks.r_shoulder_visibility
 
         # Determine webcam position relative to the user
         # Higher visibility on left side means webcam is on the right and vice versa
@@ -150,97 +235,58 @@ class PostureAnalyzer:
         if self.same_side_frames < 60:
             self.same_side_frames += 1
 
-        results["webcam_position"] = self.webcam_position
+        results.webcam_position = self.webcam_position
 
-        results["webcam_placement"] = "good"
-        if (results["webcam_position"] == "right" and r_ear_vis < 0.90) or (
-            results["webcam_position"] == "left" and l_ear_vis < 0.90
+        results.webcam_placement = "good"
+        if (results.webcam_position == "right" and r_ear_vis < 0.90) or (
+            results.webcam_position == "left" and l_ear_vis < 0.90
         ):
-            results["webcam_placement"] = "ear"
+            results.webcam_placement = "ear"
 
-        if max(l_hip_vis, r_hip_vis) < 0.75:
-            results["webcam_placement"] = "hip"
+        max_hip_vis = l_hip_vis if l_hip_vis > r_hip_vis else r_hip_vis
+        if max_hip_vis < 0.75:
+            results.webcam_placement = "hip"
 
-        if min(l_shoulder_vis, r_shoulder_vis) < 0.93:
-            results["webcam_placement"] = "shoulder"
+        min_shoulder_vis = l_shoulder_vis if l_shoulder_vis < r_shoulder_vis else r_shoulder_vis
+        if min_shoulder_vis < 0.93:
+            results.webcam_placement = "shoulder"
 
-        if self.webcam_placement != results["webcam_placement"]:
-            print(results["webcam_placement"])
+        if self.webcam_placement != results.webcam_placement:
+            logger.debug("Webcam placement changed: %s", results.webcam_placement)
 
-        self.webcam_placement = results["webcam_placement"]
+        self.webcam_placement = results.webcam_placement
 
         # Check if all required landmarks are available
         if None in [l_shoulder, r_shoulder] or (l_ear is None and r_ear is None) or (l_hip is None and r_hip is None):
             return results
 
-        # Unpack coordinates
-        l_shldr_x, l_shldr_y = l_shoulder
-        r_shldr_x, r_shldr_y = r_shoulder
-
-        # Use the more visible ear for neck angle calculation
-        if primary_ear == "left" and l_ear is not None:
-            ear_x, ear_y = l_ear
-            shoulder_x, shoulder_y = l_shoulder  # Use left shoulder with left ear
-        elif r_ear is not None:
-            ear_x, ear_y = r_ear
-            shoulder_x, shoulder_y = r_shoulder  # Use right shoulder with right ear
-        else:
-            # Fallback to whatever ear is available
-            if l_ear is not None:
-                ear_x, ear_y = l_ear
-                shoulder_x, shoulder_y = l_shoulder
-            else:
-                ear_x, ear_y = r_ear
-                shoulder_x, shoulder_y = r_shoulder
-
-        # Use the more visible hip
-        if primary_ear == "left" and l_hip is not None:  # Assume if left ear is more visible, left hip might be too
-            hip_x, hip_y = l_hip
-        elif r_hip is not None:
-            hip_x, hip_y = r_hip
-        else:
-            # Fallback to whatever hip is available
-            if l_hip is not None:
-                hip_x, hip_y = l_hip
-            else:
-                hip_x, hip_y = r_hip
-
-        # Calculate shoulder offset
-        results["shoulders_offset"] = self.calculate_distance(l_shldr_x, l_shldr_y, r_shldr_x, r_shldr_y)
-
-        # Calculate angles
-        results["neck_angle"] = self.calculate_angle(shoulder_x, shoulder_y, ear_x, ear_y)
-        results["torso_angle"] = self.calculate_angle(hip_x, hip_y, shoulder_x, shoulder_y)
-        # results["reclination"] = self.calculate_angle(
-
-        # Calculate relative angle between neck and torso
-        results["relative_neck_angle"] = min(abs(results["neck_angle"] - results["torso_angle"]), results["neck_angle"])
-
-        # print("-------------------")
-        # print(results["torso_angle"])
-        # print(results["relative_neck_angle"])
-
-        # Alternative condition: neck angle is smaller than torso angle (head is actually back)
-        # This happens in a true reclined position
-        # neck_behind_torso = results["neck_angle"] < results["torso_angle"] todo capire se serve ancora a qualcosa (non penso)
-
-        # this helps a bit with reclined chairs, otherwise is too aggressive
-        relative_neck_angle = results["relative_neck_angle"]
-        if results["torso_angle"] <= -30:
-            relative_neck_angle = int(relative_neck_angle / 1.5)
-
-        # compute scores
-        positive_neck_angle = relative_neck_angle if relative_neck_angle >= 0 else -relative_neck_angle
-        positive_torso_angle = results["torso_angle"] if results["torso_angle"] >= 0 else -results["torso_angle"]
-
-        results["neck_score"] = self.compute_score(NECK_SCORE_MAP, positive_neck_angle)
-        results["torso_score"] = self.compute_score(TORSO_SCORE_MAP, positive_torso_angle)
-        results["shoulders_score"] = self.compute_score(SHOULDERS_SCORE_MAP, results["shoulders_offset"])
-
-        results["good_posture"] = (
-            results["neck_score"] >= sensitivity
-            and results["neck_score"] >= sensitivity
-            and results["neck_score"] >= sensitivity
+        # Pick the more visible side (0 = left, 1 = right), falling back to the other side if missing
+        ears = (l_ear, r_ear)
+        shoulders = (l_shoulder, r_shoulder)
+        hips = (l_hip, r_hip)
+        primary_side = 0 if primary_ear == "left" else 1
+
+        # Use the more visible ear, with the shoulder on the same side, for neck angle calculation
+        side = primary_side if ears[primary_side] is not None else primary_side ^ 1
+
+        # Assume if left ear is more visible, left hip might be too
+        hip_side = primary_side if hips[primary_side] is not None else primary_side ^ 1
+
+        (
+            results.shoulders_offset,
+            results.neck_angle,
+            results.torso_angle,
+            results.relative_neck_angle,
+            results.neck_score,
+            results.torso_score,
+            results.shoulders_score,
+        ) = self._posture_metrics(l_shoulder, r_shoulder, shoulders[side], ears[side], hips[hip_side])
+
+        neck_score = results.neck_score
+        torso_score = results.torso_score
+        shoulders_score = results.shoulders_score
+        results.good_posture = (
+            neck_score >= sensitivity and torso_score >= sensitivity and shoulders_score >= sensitivity
         )
 
         return results
@@ -3,39 +3,138 @@ Main posture detection module that integrates camera capture and posture analysi
 """
 
 import asyncio
-import multiprocessing
+import logging
+import operator
 import os
+import queue
 import signal
+import threading
 import time
-from datetime import datetime, timedelta
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 import cv2
 import mediapipe as mp
+import numpy as np
 from PyQt6.QtCore import QObject, pyqtSignal
-from PyQt6.QtWidgets import QApplication
 
 from config.settings import (
     ALERT_SLIDING_WINDOW_DURATION,
+    BODY_COMPONENTS,
     COLORS,
+    DEFAULT_MODEL_COMPLEXITY,
+    FRAME_DIFF_MAX_AGE,
+    FRAME_DIFF_THRESHOLD,
+    INFER_EVERY_N_FRAMES,
+    INFERENCE_MAX_WIDTH,
+    MAX_POSE_LATENCY,
+    POSE_LATENCY_FRAMES,
+    PREVIEW_SLIDING_WINDOW_DURATION,
     SEND_INTERVAL,
     SLIDING_WINDOW_DURATION,
+    UI_MAX_FPS,
     WARNING_COOLDOWN,
 )
-from config.settings import BODY_COMPONENTS
-from detector.posture_analyzer import PostureAnalyzer, is_looking_at_camera
+from detector.posture_analyzer import LandmarkSet, PostureAnalyzer, is_looking_at_camera
 from utils.pigpio import PigpioClient
 from utils.raspi_screen import set_screen_cooldown, turn_on_screen
-from utils.visualization import (
-    draw_landmarks,
-    get_optimal_font_scale,
-)
+
+logger = logging.getLogger(__name__)
+
+# Message shown in the posture window when a component triggers a vibration alert
+COMPONENT_ALERTS = {
+    "neck_score": "Straighten your neck",
+    "torso_score": "Sit upright",
+    "shoulders_score": "Face the desk",
+}
+
+
+# (width, height) scale factors of the camera frame for each resize key: arrow keys and WASD
+RESIZE_KEYS = {
+    82: (1, 1.1),  # Up arrow
+    ord("w"): (1, 1.1),
+    84: (1, 0.9),  # Down arrow
+    ord("s"): (1, 0.9),
+    83: (1.1, 1),  # Right arrow
+    ord("d"): (1.1, 1),
+    81: (0.9, 1),  # Left arrow
+    ord("a"): (0.9, 1),
+}
+
+
+def _env_flag(name):
+    """
+    Read a boolean feature flag from the environment
+
+    Args:
+        name: Name of the environment variable
+
+    Returns:
+        Boolean: True if the variable is set to "true", "1" or "yes"
+    """
+    return os.getenv(name, "").lower() in ("true", "1", "yes")
+
+
+class _RollingScores:
+    """Running per-component score sums over the entries of the last `seconds` seconds"""
+
+    def __init__(self, seconds, size):
+        """
+        Args:
+            seconds: Length of the window in seconds
+            size: Number of score components
+        """
+        self.seconds = seconds
+        self.entries = deque()
+        self.sums = [0.0] * size
+
+    def add(self, timestamp, scores):
+        """Add the scores of a new entry to the window"""
+        self.entries.append((timestamp, scores))
+        sums = self.sums
+        for i, score in enumerate(scores):
+            sums[i] += score
+
+    def expire(self, now):
+        """Drop the entries older than the window, subtracting their scores"""
+        threshold = now - self.seconds
+        entries = self.entries
+        sums = self.sums
+        while entries and entries[0][0] < threshold:
+            for i, score in enumerate(entries.popleft()[1]):
+                sums[i] -= score
+        if not entries:
+            # Start again from exact zeros so rounding errors don't accumulate
+            self.sums = [0.0] * len(sums)
+
+    def averages(self):
+        """Average of each component over the window, 0 when empty"""
+        count = len(self.entries)
+        if count == 0:
+            return [0] * len(self.sums)
+        # Rounding first absorbs the float residue left by the subtractions, so that e.g. a window
+        # of 100s still averages to 100 and not 99
+        return [int(round(total / count, 6)) for total in self.sums]
 
 
 class PostureDetector(QObject):
     """Main class for posture detection"""
 
+    # Colors of the posture components, looked up once instead of on every frame
+    _COLOR_RED = COLORS["red"]
+    _COLOR_YELLOW = COLORS["yellow"]
+    _COLOR_GREEN = COLORS["green"]
+
     def __init__(
-        self, camera_manager, show_guidance=True, model_complexity=2, websocket_client=None, app_controller=None
+        self,
+        camera_manager,
+        show_guidance=True,
+        model_complexity=DEFAULT_MODEL_COMPLEXITY,
+        websocket_client=None,
+        app_controller=None,
+        inference_width=INFERENCE_MAX_WIDTH,
+        headless=False,
+        infer_every=INFER_EVERY_N_FRAMES,
     ):
         """
         Initialize posture detector
@@ -46,10 +145,16 @@ class PostureDetector(QObject):
             model_complexity: Complexity of the MediaPipe pose model (0, 1, or 2)
             websocket_client: WebSocket client for sending/receiving data
             app_controller: Controller for the PyQt application
+            inference_width: Maximum width of the frames given to MediaPipe, wider frames are downscaled
+            headless: Skip drawing the webcam preview, the analysis, alerts and telemetry keep running
+            infer_every: Run pose detection on one camera frame out of this many
         """
         super().__init__()
         self.camera_manager = camera_manager
         self.show_guidance = show_guidance
+        self.inference_width = max(1, inference_width)
+        self.headless = headless
+        self.infer_every = max(1, infer_every)
         self.posture_data_updated = pyqtSignal(dict)
 
         # Initialize frame counters
@@ -58,14 +163,31 @@ class PostureDetector(QObject):
 
         # Initialize MediaPipe pose detection
         self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
-            model_complexity=model_complexity, min_detection_confidence=0.7, min_tracking_confidence=0.7
+        self.model_complexity = model_complexity
+        self.pose = self._create_pose(model_complexity)
+        # Time spent in pose.process over the current measurement period, and number of inferences in it.
+        # -1 until the first inference of the model, which includes its one-time warm-up and is not measured
+        self._pose_time = 0.0
+        self._pose_count = -1
+
+        # Indices of the landmarks used by the analyzer, in LandmarkSet order, as plain ints
+        lm_pose = self.mp_pose.PoseLandmark
+        self._landmark_idx = tuple(
+            int(index)
+            for index in (
+                lm_pose.LEFT_SHOULDER,
+                lm_pose.RIGHT_SHOULDER,
+                lm_pose.LEFT_EAR,
+                lm_pose.RIGHT_EAR,
+                lm_pose.LEFT_HIP,
+                lm_pose.RIGHT_HIP,
+            )
         )
 
         # Initialize posture analyzer
         self.analyzer = PostureAnalyzer()
 
-        # Warning timer
+        # Warning timer (time.monotonic() of the last vibration alert)
         self.last_alert_time = None
 
         # Register signal handlers for graceful shutdown
@@ -74,84 +196,193 @@ class PostureDetector(QObject):
 
         self.old_posture = None
 
-        self.last_sent_time = time.time()
         self.last_sent_posture = None
         self.SEND_INTERVAL = SEND_INTERVAL  # seconds
+        # Set by process_frame when a frame was analyzed, so _send_loop only sends while the user is tracked
+        self._posture_updated = False
 
-        self.history = []
+        # (time.monotonic() timestamp, component scores in self._components order), oldest first
+        self.history = deque()
         self.app_controller = app_controller
         self.websocket_client = websocket_client
         self.settings = {}
 
+        self.resize_mode = False
+        # Keyboard shortcuts, resolved once instead of comparing the key against each of them
+        self._key_actions = {
+            ord("q"): self._quit,
+            ord("r"): self._toggle_resize_mode,
+            ord("f"): self._toggle_fullscreen,
+        }
+
+        # (component name, score key) pairs, resolved once instead of walking BODY_COMPONENTS every frame
+        self._components = tuple((name, component.score) for name, component in BODY_COMPONENTS.items())
+        # Reads the component scores of an analysis result as a tuple, in the same order
+        self._scores_of = operator.attrgetter(*(score_key for _, score_key in self._components))
+
+        # MediaPipe runs on a single dedicated thread, so the pose graph is always used from the same thread
+        self._pose_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pose")
+        # Blocking camera reads get their own thread instead of sharing the loop's default executor
+        self._camera_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cam")
+        self._pipeline_tasks = ()
+
+        # Reused destination buffers for the resize and color conversion before pose detection,
+        # allocated for the shape of the camera frames
+        self._frame_shape = None
+        self._small_size = None
+        self._small_buf = None
+        self._rgb_buf = None
+
+        # Thumbnail, pose results and time.monotonic() of the last frame that went through MediaPipe
+        self._prev_thumbnail = None
+        self._last_pose_result = None
+        self._last_pose_time = 0.0
+
+        # Rolling score sums for each window length requested from _get_average_score, created on first use
+        self._score_windows = {}
+
         # Store last frame data for UI updates
-        self._last_landmarks = {}
-        self._last_analysis_results = {}
+        self._last_landmarks = None
+        self._last_analysis_results = None
+        self._last_colors = None
+        self._next_ui_update = 0.0
 
-        if os.getenv("DISABLE_VIBRATION", False).lower() not in ["true", "1", "yes"]:
+        # Feature flags, read once instead of on every frame
+        self._disable_vibration = _env_flag("DISABLE_VIBRATION")
+        self._disable_telemetry = _env_flag("DISABLE_TELEMETRY")
+        self._raspi_display = _env_flag("RASPI_DISPLAY")
+
+        if not self._disable_vibration:
             self.gpio_client = PigpioClient()
+            # Vibration alerts block for several seconds, so they are played by a long-lived worker thread
+            self._alert_queue = queue.Queue(maxsize=4)
+            threading.Thread(target=self._alert_worker, name="vibration-alerts", daemon=True).start()
 
-    def _update_history(self, analysis_results):
-        if analysis_results["webcam_placement"] != "good":
+    def _create_pose(self, model_complexity):
+        """
+        Create the MediaPipe pose model
+
+        Args:
+            model_complexity: Complexity of the MediaPipe pose model (0, 1, or 2)
+
+        Returns:
+            MediaPipe Pose instance
+        """
+        # Video mode with smoothing: the person detector only runs when the landmark tracker loses the person
+        return self.mp_pose.Pose(
+            static_image_mode=False,
+            model_complexity=model_complexity,
+            smooth_landmarks=True,
+            enable_segmentation=False,
+            min_detection_confidence=0.5,
+            # A lower tracking confidence keeps MediaPipe on the cheap tracker instead of re-detecting the person
+            min_tracking_confidence=0.5,
+        )
+
+    def _record_pose_latency(self, elapsed):
+        """
+        Track the pose model latency, switching to a lighter model when the device can't keep up
+
+        Runs in the pose executor thread, so the model is never replaced while in use.
+
+        Args:
+            elapsed: Seconds spent in the last pose.process call
+        """
+        if self._pose_count < 0:
+            # Skip the warm-up of a new model
+            self._pose_count = 0
             return
-        self.history.append((datetime.now(), analysis_results))
 
-        # todo make it an async task
-        # pop elements if ALERT_SLIDING_WINDOW_DURATION (which is a duration in seconds) is reached
-        while len(self.history) > 0:
-            first_time, _ = self.history[0]
-            now = datetime.now()
-            diff = now - first_time
-            if diff.total_seconds() > ALERT_SLIDING_WINDOW_DURATION:
-                self.history.pop(0)
-            else:
-                break
+        self._pose_time += elapsed
+        self._pose_count += 1
+        if self._pose_count < POSE_LATENCY_FRAMES:
+            return
 
-    def _get_average_score(self, seconds):
-        # Get the current time
-        now = datetime.now()
-        # Calculate the time threshold
-        time_threshold = now - timedelta(seconds=seconds)
-        # Filter the history to include only entries within the time threshold
-        filtered_history = [entry for entry in self.history if entry[0] >= time_threshold]
-        # Calculate the average score for each component
-        average_scores = {}
-
-        for component_name, attributes in BODY_COMPONENTS.items():
-            # Get the score name
-            score_key = attributes["score"]
-            # Get the scores for the filtered history
-            scores = [entry[1][score_key] for entry in filtered_history]
-            # Calculate the average score
-            if len(scores) > 0:
-                average_scores[score_key] = int(sum(scores) / len(scores))
-            else:
-                average_scores[score_key] = 0
+        average = self._pose_time / self._pose_count
+        self._pose_time = 0.0
+        self._pose_count = 0
+        if average > MAX_POSE_LATENCY and self.model_complexity > 0:
+            self.model_complexity -= 1
+            print(
+                f"Pose detection takes {average * 1000:.0f} ms per frame, "
+                f"switching to model complexity {self.model_complexity}"
+            )
+            self.pose.close()
+            self.pose = self._create_pose(self.model_complexity)
+            self._pose_count = -1
 
-        return average_scores
+    def _alert_worker(self):
+        """Play the vibration alerts queued by process_frame, one at a time"""
+        while True:
+            intensity = self._alert_queue.get()
+            try:
+                self.gpio_client.long_alert_thread(intensity)
+            except Exception as e:
+                # Keep the worker alive: a pigpiod hiccup only loses this alert
+                print(f"Error playing vibration alert: {e}")
 
-    def _maybe_send_posture(self, analysis_results):
-        if os.getenv("DISABLE_TELEMETRY", False).lower() in ["true", "1", "yes"]:
+    def _update_history(self, analysis_results):
+        if analysis_results.webcam_placement != "good":
             return
+        now = time.monotonic()
+        scores = self._scores_of(analysis_results)
+        self.history.append((now, scores))
+
+        if self._score_windows:
+            for window in self._score_windows.values():
+                window.add(now, scores)
+                window.expire(now)
+
+        # todo make it an async task
+        # pop elements if ALERT_SLIDING_WINDOW_DURATION (which is a duration in seconds) is reached
+        while self.history and now - self.history[0][0] > ALERT_SLIDING_WINDOW_DURATION:
+            self.history.popleft()
 
-        now = time.time()
-        time_passed = now - self.last_sent_time > self.SEND_INTERVAL
+    def _get_average_score(self, seconds):
+        now = time.monotonic()
+        window = self._score_windows.get(seconds)
+        if window is None:
+            # First request for this window length: seed it from the history
+            window = _RollingScores(seconds, len(self._components))
+            for timestamp, scores in self.history:
+                window.add(timestamp, scores)
+            self._score_windows[seconds] = window
+
+        # Entries also age out between frames that are not added to the history
+        window.expire(now)
+
+        return {score_key: average for (_, score_key), average in zip(self._components, window.averages())}
+
+    async def _send_loop(self):
+        """Send the posture averages every SEND_INTERVAL seconds, if frames were analyzed in the meantime"""
+        while True:
+            await asyncio.sleep(self.SEND_INTERVAL)
+            if not self._posture_updated:
+                continue
+            self._posture_updated = False
 
-        if time_passed:
             # self._prepare_data()
             components = self._get_average_score(self.SEND_INTERVAL)
-            print(f"[Posture Update] Sending data: {components}")
-            asyncio.create_task(self.websocket_client.send_posture_data(components))
-            self.last_sent_time = now
-            return True
-
-        return False
+            logger.debug("Sending posture data: %s", components)
+            # Sends are awaited one at a time: on a slow network the next averages simply go out later
+            try:
+                await self.websocket_client.send_posture_data(components)
+            except Exception:
+                logger.exception("Error sending posture data")
 
     def cleanup_and_exit(self, signum=None, frame=None):
         """Clean up resources and exit the program"""
         print("\nShutting down posture detector...")
-        # Release camera
+        # Stop the pose thread from picking up new work
+        self._pose_executor.shutdown(wait=False, cancel_futures=True)
+
+        # Release camera on the camera thread, after any read still in flight, then stop that thread too
         if self.camera_manager.is_open():
-            self.camera_manager.release()
+            try:
+                self._camera_executor.submit(self.camera_manager.release).result(timeout=2)
+            except Exception as e:
+                print(f"Error releasing camera: {e}")
+        self._camera_executor.shutdown(wait=False, cancel_futures=True)
 
         # Hide PyQt windows
         if self.app_controller:
@@ -171,23 +402,6 @@ class PostureDetector(QObject):
         # Exit forcefully to ensure complete termination
         os._exit(0)
 
-    def handle_keyboard_input(self, key):
-        """
-        Handle keyboard input during the application
-        Note: This is a simplified version since we're not using OpenCV windows
-
-        Args:
-            key: Key pressed by user
-
-        Returns:
-            Boolean: True to continue, False to exit
-        """
-        if key == ord("q"):
-            return False
-
-        # All window resize functionality has been removed since we're not using OpenCV windows
-        return True
-
     def extract_landmarks(self, pose_landmarks, frame_width, frame_height):
         """
         Extract key landmarks from MediaPipe pose results
@@ -198,109 +412,117 @@ class PostureDetector(QObject):
             frame_height: Height of the frame
 
         Returns:
-            Dictionary: Key landmarks with coordinates
+            LandmarkSet: Key landmarks with coordinates
         """
-        lm = pose_landmarks
-        lmPose = self.mp_pose.PoseLandmark
-
-        landmarks = {}
-
         try:
-            # Left shoulder
-            landmarks["l_shoulder"] = (
-                int(lm.landmark[lmPose.LEFT_SHOULDER].x * frame_width),
-                int(lm.landmark[lmPose.LEFT_SHOULDER].y * frame_height),
+            # Gather (x, y, visibility) of the landmarks we need in one array, then scale them together
+            lm = pose_landmarks.landmark
+            points = np.array([(lm[i].x, lm[i].y, lm[i].visibility) for i in self._landmark_idx], dtype=np.float64)
+
+            coords = (points[:, :2] * (frame_width, frame_height)).astype(np.int32).tolist()
+            l_shoulder, r_shoulder, l_ear, r_ear, l_hip, r_hip = map(tuple, coords)
+            l_shoulder_vis, r_shoulder_vis, l_ear_vis, r_ear_vis, l_hip_vis, r_hip_vis = points[:, 2].tolist()
+
+            return LandmarkSet(
+                l_shoulder=l_shoulder,
+                r_shoulder=r_shoulder,
+                l_ear=l_ear,
+                r_ear=r_ear,
+                l_hip=l_hip,
+                r_hip=r_hip,
+                # Which ear is more visible (useful for analyzing posture)
+                primary_ear="left" if l_ear_vis >= r_ear_vis else "right",
+                l_ear_visibility=l_ear_vis,
+                r_ear_visibility=r_ear_vis,
+                l_hip_visibility=l_hip_vis,
+                r_hip_visibility=r_hip_vis,
+                l_shoulder_visibility=l_shoulder_vis,
+                r_shoulder_visibility=r_shoulder_vis,
             )
 
-            # Right shoulder
-            landmarks["r_shoulder"] = (
-                int(lm.landmark[lmPose.RIGHT_SHOULDER].x * frame_width),
-                int(lm.landmark[lmPose.RIGHT_SHOULDER].y * frame_height),
-            )
+        except Exception as e:
+            print(f"Error extracting landmarks: {e}")
+            return LandmarkSet()
 
-            # Both ears for better detection regardless of webcam position
-            landmarks["l_ear"] = (
-                int(lm.landmark[lmPose.LEFT_EAR].x * frame_width),
-                int(lm.landmark[lmPose.LEFT_EAR].y * frame_height),
-            )
+    def _allocate_inference_buffers(self, frame_shape):
+        """
+        Compute the inference size for a frame shape and allocate the buffers for it
 
-            landmarks["r_ear"] = (
-                int(lm.landmark[lmPose.RIGHT_EAR].x * frame_width),
-                int(lm.landmark[lmPose.RIGHT_EAR].y * frame_height),
-            )
+        Args:
+            frame_shape: Shape (height, width, channels) of the camera frames
+        """
+        h, w = frame_shape[:2]
+        self._frame_shape = frame_shape
+        self._small_size = None
+        self._small_buf = None
+        if w > self.inference_width:
+            self._small_size = (self.inference_width, max(1, round(h * self.inference_width / w)))
+            self._small_buf = np.empty((self._small_size[1], self._small_size[0], 3), dtype=np.uint8)
+            self._rgb_buf = np.empty_like(self._small_buf)
+        else:
+            self._rgb_buf = np.empty(frame_shape, dtype=np.uint8)
 
-            # Left hip
-            landmarks["l_hip"] = (
-                int(lm.landmark[lmPose.LEFT_HIP].x * frame_width),
-                int(lm.landmark[lmPose.LEFT_HIP].y * frame_height),
-            )
+    def detect_pose(self, frame):
+        """
+        Run MediaPipe pose detection on a frame
 
-            # Right hip
-            landmarks["r_hip"] = (
-                int(lm.landmark[lmPose.RIGHT_HIP].x * frame_width),
-                int(lm.landmark[lmPose.RIGHT_HIP].y * frame_height),
-            )
+        Runs in the pose executor thread, so it only touches the pose model and its own buffers.
 
-            # Calculate visibility scores for ear landmarks
-            # Higher score = more visible/reliable
-            l_ear_vis = (
-                lm.landmark[lmPose.LEFT_EAR].visibility if hasattr(lm.landmark[lmPose.LEFT_EAR], "visibility") else 0
-            )
-            r_ear_vis = (
-                lm.landmark[lmPose.RIGHT_EAR].visibility if hasattr(lm.landmark[lmPose.RIGHT_EAR], "visibility") else 0
-            )
-            l_hip_vis = (
-                lm.landmark[lmPose.LEFT_HIP].visibility if hasattr(lm.landmark[lmPose.LEFT_HIP], "visibility") else 0
-            )
-            r_hip_vis = (
-                lm.landmark[lmPose.RIGHT_HIP].visibility if hasattr(lm.landmark[lmPose.RIGHT_HIP], "visibility") else 0
-            )
-            l_shoulder_vis = (
-                lm.landmark[lmPose.LEFT_SHOULDER].visibility
-                if hasattr(lm.landmark[lmPose.LEFT_SHOULDER], "visibility")
-                else 0
-            )
-            r_shoulder_vis = (
-                lm.landmark[lmPose.RIGHT_SHOULDER].visibility
-                if hasattr(lm.landmark[lmPose.RIGHT_SHOULDER], "visibility")
-                else 0
-            )
+        Args:
+            frame: Camera frame in BGR format
 
-            # Add information about which ear is more visible (useful for analyzing posture)
-            landmarks["primary_ear"] = "left" if l_ear_vis >= r_ear_vis else "right"
-            landmarks["l_ear_visibility"] = l_ear_vis
-            landmarks["r_ear_visibility"] = r_ear_vis
-            landmarks["l_hip_visibility"] = l_hip_vis
-            landmarks["r_hip_visibility"] = r_hip_vis
-            landmarks["l_shoulder_visibility"] = l_shoulder_vis
-            landmarks["r_shoulder_visibility"] = r_shoulder_vis
+        Returns:
+            MediaPipe pose results
+        """
+        # Everything that depends on the camera resolution is derived once, when the first frame
+        # (or the first one after a resolution change) comes in
+        if frame.shape != self._frame_shape:
+            self._allocate_inference_buffers(frame.shape)
+
+        # MediaPipe scales its input down to the model size anyway, so feed it a smaller frame.
+        # Landmarks are normalized, so they still map onto the full size frame.
+        small_frame = frame
+        if self._small_buf is not None:
+            small_frame = cv2.resize(frame, self._small_size, dst=self._small_buf, interpolation=cv2.INTER_AREA)
+
+        # A still user gives (almost) the same frame again: reuse the last pose results, unless they are too old
+        now = time.monotonic()
+        thumbnail = cv2.resize(small_frame, (16, 16), interpolation=cv2.INTER_AREA).astype(np.int16)
+        if self._prev_thumbnail is not None and self._last_pose_result is not None:
+            if (
+                now - self._last_pose_time < FRAME_DIFF_MAX_AGE
+                and np.abs(thumbnail - self._prev_thumbnail).mean() < FRAME_DIFF_THRESHOLD
+            ):
+                return self._last_pose_result
+        self._prev_thumbnail = thumbnail
+        self._last_pose_time = now
 
-            return landmarks
+        # Convert the BGR image to RGB for MediaPipe
+        self._rgb_buf.flags.writeable = True
+        rgb_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB, dst=self._rgb_buf)
 
-        except Exception as e:
-            print(f"Error extracting landmarks: {e}")
-            return {}
+        # Process the image with MediaPipe, a read-only array is passed by reference instead of being copied
+        rgb_frame.flags.writeable = False
+        start = time.perf_counter()
+        result = self.pose.process(rgb_frame)
+        self._record_pose_latency(time.perf_counter() - start)
+        self._last_pose_result = result
+        return result
 
-    async def process_frame(self, frame):
+    async def process_frame(self, frame, result):
         """
         Process a single frame for posture detection
 
         Args:
             frame: Camera frame to process
+            result: MediaPipe pose results for the frame
 
         Returns:
             Processed frame with annotations
         """
         # Get height and width
         h, w = frame.shape[:2]
-        font_scale = get_optimal_font_scale(w)
-        thickness = max(1, int(w / 640))
-
-        # Convert the BGR image to RGB for MediaPipe
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
-        # Process the image with MediaPipe
-        result = self.pose.process(rgb_frame)
         if not result.pose_landmarks:
             webcam_placement_text = f"Person is not visible"
             self.app_controller.posture_window.show_alert(
@@ -310,77 +532,72 @@ class PostureDetector(QObject):
 
         # Extract landmarks
         landmarks = self.extract_landmarks(result.pose_landmarks, w, h)
-        draw_landmarks(frame, landmarks)
 
         sensitivity = self.settings.get("sensitivity", -1)
         # Analyze posture
         analysis_results = self.analyzer.analyze_posture(landmarks, sensitivity)
 
         self._update_history(analysis_results)
-        self._maybe_send_posture(analysis_results)
+        self._posture_updated = True
 
         last_scores = self._get_average_score(SLIDING_WINDOW_DURATION)
 
-        webcam_placement = analysis_results.get("webcam_placement", "unknown")
+        webcam_placement = analysis_results.webcam_placement
         # todo if is sitted for long, start idle stuff
 
         results = {"scores": last_scores, "issues": dict()}
 
         if webcam_placement == "good":
-            if last_scores[BODY_COMPONENTS["neck"]["score"]] < sensitivity:
+            if last_scores[BODY_COMPONENTS["neck"].score] < sensitivity:
                 results["issues"]["neck"] = "Straighten your neck"
 
-            if last_scores[BODY_COMPONENTS["torso"]["score"]] < sensitivity:
+            if last_scores[BODY_COMPONENTS["torso"].score] < sensitivity:
                 results["issues"]["torso"] = "Sit upright"
 
-            if last_scores[BODY_COMPONENTS["shoulders"]["score"]] < sensitivity:
+            if last_scores[BODY_COMPONENTS["shoulders"].score] < sensitivity:
                 results["issues"]["shoulders"] = "Face the screen"
         else:
             results = {}
-        colors = self.get_colors(SLIDING_WINDOW_DURATION)
+        colors = self._colors_from_scores(last_scores)
         self.app_controller.posture_window.update_results(results, colors)
 
-        if os.getenv("RASPI_DISPLAY", False).lower() in ["true", "1", "yes"]:
+        if self._raspi_display:
             user_looking = is_looking_at_camera(result.pose_landmarks.landmark)
             if user_looking:
                 turn_on_screen()  # wake up the screen if user is looking at it
 
-        if os.getenv("DISABLE_VIBRATION", False).lower() not in ["true", "1", "yes"]:
+        if not self._disable_vibration:
             # If the last posture is bad then...
-            if not analysis_results["good_posture"]:
+            if not analysis_results.good_posture:
                 scores = self._get_average_score(ALERT_SLIDING_WINDOW_DURATION)
                 # For each component, check if the score is below the sensitivity threshold to trigger alert
                 for component, score in scores.items():
                     if score < sensitivity:
                         print("bad avg score:", component, "is", score)
-                        now = datetime.now()
-                        if self.last_alert_time is None or now - self.last_alert_time > timedelta(
-                            seconds=WARNING_COOLDOWN
-                        ):
+                        now = time.monotonic()
+                        if self.last_alert_time is None or now - self.last_alert_time > WARNING_COOLDOWN:
                             print("alert successfully sent")
-                            p = multiprocessing.Process(target=self.gpio_client.long_alert_thread, args=(self.settings.get("vibration_intensity", 100),))
                             # Show alert in the posture window
-                            webcam_placement_text = ""
-                            match component:
-                                case "neck_score":
-                                    webcam_placement_text = "Straighten your neck"
-                                case "torso_score":
-                                    webcam_placement_text = "Sit upright"
-                                case "shoulders_score":
-                                    webcam_placement_text = "Face the desk"
+                            webcam_placement_text = COMPONENT_ALERTS.get(component, "")
                             self.app_controller.posture_window.show_alert(
                                 webcam_placement_text, 5000
                             )
-                            p.start()
+                            try:
+                                self._alert_queue.put_nowait(self.settings.get("vibration_intensity", 100))
+                            except queue.Full:
+                                pass
                             self.last_alert_time = now
+                            # One alert per frame, the other components are in cooldown now
+                            break
 
 
         # Update landmarks with head tilted back status for visualization
-        landmarks["is_head_tilted_back"] = analysis_results["is_head_tilted_back"]
+        landmarks = landmarks._replace(is_head_tilted_back=analysis_results.is_head_tilted_back)
 
         # Store landmarks and analysis results for UI updates
         self._last_landmarks = landmarks
         self._last_analysis_results = analysis_results
+        self._last_colors = self.get_colors(PREVIEW_SLIDING_WINDOW_DURATION)
 
         # Add main angle text at top
         if webcam_placement != "good":
@@ -395,16 +612,22 @@ class PostureDetector(QObject):
         """
         Get the colors for the posture components based on the sliding window size
         """
-        scores = self._get_average_score(sliding_window_size)
+        return self._colors_from_scores(self._get_average_score(sliding_window_size))
+
+    def _colors_from_scores(self, scores):
+        """
+        Get the colors for the posture components from their average scores
+        """
         components = {}
-        for component, attributes in BODY_COMPONENTS.items():
-            score = scores.get(attributes["score"])
-            if self.settings.get("sensitivity", 75) - score >= 10:
-                components[component] = COLORS["red"]
-            elif self.settings.get("sensitivity", 75) - score >= 0:
-                components[component] = COLORS["yellow"]
+        sensitivity = self.settings.get("sensitivity", 75)
+        for component, score_key in self._components:
+            score = scores.get(score_key)
+            if sensitivity - score >= 10:
+                components[component] = self._COLOR_RED
+            elif sensitivity - score >= 0:
+                components[component] = self._COLOR_YELLOW
             else:
-                components[component] = COLORS["green"]
+                components[component] = self._COLOR_GREEN
         return components
 
     def handle_keyboard_input(self, key):
@@ -417,40 +640,15 @@ class PostureDetector(QObject):
         Returns:
             Boolean: True to continue, False to exit
         """
-        if key == ord("q"):
-            return False
-        elif key == ord("r"):
-            # Toggle resize mode
-            self.resize_mode = not self.resize_mode
-            mode_text = "ON" if self.resize_mode else "OFF"
-            print(f"Resize mode: {mode_text}")
-            if self.resize_mode:
-                print("Use arrow keys to resize the window. Press 'r' again to exit resize mode.")
-        elif key == ord("f"):
-            # Toggle fullscreen
-            current_prop = cv2.getWindowProperty(self.window_name, cv2.WND_PROP_FULLSCREEN)
-            if current_prop == cv2.WINDOW_NORMAL:
-                cv2.setWindowProperty(self.window_name, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
-                print("Fullscreen mode enabled")
-            else:
-                cv2.setWindowProperty(self.window_name, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_NORMAL)
-                print("Fullscreen mode disabled")
-        elif self.resize_mode:
-            # Handle resize control
-            width, height = (
-                self.camera_manager.frame_width,
-                self.camera_manager.frame_height,
-            )
+        action = self._key_actions.get(key)
+        if action is not None:
+            return action()
 
-            # Adjust dimensions based on arrow keys
-            if key == 82 or key == ord("w"):  # Up arrow or 'w'
-                height = int(height * 1.1)
-            elif key == 84 or key == ord("s"):  # Down arrow or 's'
-                height = int(height * 0.9)
-            elif key == 83 or key == ord("d"):  # Right arrow or 'd'
-                width = int(width * 1.1)
-            elif key == 81 or key == ord("a"):  # Left arrow or 'a'
-                width = int(width * 0.9)
+        if self.resize_mode and key in RESIZE_KEYS:
+            # Handle resize control
+            width_factor, height_factor = RESIZE_KEYS[key]
+            width = int(self.camera_manager.frame_width * width_factor)
+            height = int(self.camera_manager.frame_height * height_factor)
 
             # Apply new dimensions if changed
             if width != self.camera_manager.frame_width or height != self.camera_manager.frame_height:
@@ -459,6 +657,30 @@ class PostureDetector(QObject):
 
         return True
 
+    def _quit(self):
+        """Keyboard action: stop the application"""
+        return False
+
+    def _toggle_resize_mode(self):
+        """Keyboard action: toggle resize mode"""
+        self.resize_mode = not self.resize_mode
+        mode_text = "ON" if self.resize_mode else "OFF"
+        print(f"Resize mode: {mode_text}")
+        if self.resize_mode:
+            print("Use arrow keys to resize the window. Press 'r' again to exit resize mode.")
+        return True
+
+    def _toggle_fullscreen(self):
+        """Keyboard action: toggle fullscreen"""
+        current_prop = cv2.getWindowProperty(self.window_name, cv2.WND_PROP_FULLSCREEN)
+        if current_prop == cv2.WINDOW_NORMAL:
+            cv2.setWindowProperty(self.window_name, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+            print("Fullscreen mode enabled")
+        else:
+            cv2.setWindowProperty(self.window_name, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_NORMAL)
+            print("Fullscreen mode disabled")
+        return True
+
     async def update_settings(self):
         """
         Continuously pull the latest settings from the websocket client
@@ -485,6 +707,83 @@ class PostureDetector(QObject):
 
             await asyncio.sleep(1)
 
+    async def _capture_frames(self, capture_queue):
+        """
+        Read camera frames into the capture queue, dropping the oldest frame when it is full
+
+        A None frame is queued when the camera stops returning frames or fails.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                success, frame = await loop.run_in_executor(self._camera_executor, self.camera_manager.read_frame)
+            except Exception as e:
+                # Nobody awaits this task: report the error to run() through the queue instead of dying silently
+                print(f"Error reading camera frame: {e}")
+                success = False
+            if not success:
+                frame = None
+
+            if capture_queue.full():
+                capture_queue.get_nowait()
+            capture_queue.put_nowait(frame)
+
+            if frame is None:
+                return
+
+    async def _infer_frames(self, capture_queue, inference_queue):
+        """
+        Run pose detection on the captured frames in the pose executor
+
+        Posture changes slowly, so the model only runs on one frame out of infer_every,
+        the frames in between are paired with the last results.
+        Queues (frame, result) pairs, dropping the oldest pair when the queue is full.
+        A None item is queued when there are no more frames or pose detection fails.
+        """
+        loop = asyncio.get_running_loop()
+        frame_idx = 0
+        while True:
+            frame = await capture_queue.get()
+            item = None
+            if frame is not None:
+                try:
+                    if frame_idx % self.infer_every == 0 or self._last_pose_result is None:
+                        result = await loop.run_in_executor(self._pose_executor, self.detect_pose, frame)
+                    else:
+                        result = self._last_pose_result
+                except Exception as e:
+                    # Nobody awaits this task: report the error to run() through the queue instead of dying silently
+                    print(f"Error detecting pose: {e}")
+                else:
+                    frame_idx += 1
+                    item = (frame, result)
+
+            if inference_queue.full():
+                inference_queue.get_nowait()
+            inference_queue.put_nowait(item)
+
+            if item is None:
+                return
+
+    def _start_pipeline(self):
+        """Start the capture and inference tasks, returning the queue with their results"""
+        # Only the latest camera frame is kept, older ones are dropped while pose detection is busy
+        capture_queue = asyncio.Queue(maxsize=1)
+        inference_queue = asyncio.Queue(maxsize=2)
+        # Don't reuse pose results from a previous session
+        self._prev_thumbnail = None
+        self._pipeline_tasks = (
+            asyncio.create_task(self._capture_frames(capture_queue)),
+            asyncio.create_task(self._infer_frames(capture_queue, inference_queue)),
+        )
+        return inference_queue
+
+    def _stop_pipeline(self):
+        """Cancel the capture and inference tasks"""
+        for task in self._pipeline_tasks:
+            task.cancel()
+        self._pipeline_tasks = ()
+
     async def run(self):
         """Main function to run the posture detection"""
         try:
@@ -517,6 +816,10 @@ class PostureDetector(QObject):
             # Start a task to continuously update settings
             asyncio.create_task(self.update_settings())
 
+            # Start the task sending the posture averages
+            if not self._disable_telemetry:
+                asyncio.create_task(self._send_loop())
+
             # Get initial session state
             initial_session_active = self.settings.get("has_active_session", False)
             print(f"Initial session status: {'🟢 ACTIVE' if initial_session_active else '🔴 INACTIVE'}")
@@ -538,6 +841,10 @@ class PostureDetector(QObject):
             # Track the current session state
             current_session_active = initial_session_active
 
+            # Results of the capture and pose detection tasks, while a session is active
+            inference_queue = None
+            loop = asyncio.get_running_loop()
+
             # Give the UI a moment to properly initialize
             await asyncio.sleep(0.2)
 
@@ -556,7 +863,7 @@ class PostureDetector(QObject):
                             self.app_controller.end_session()
 
                     # Turn on the screen if session started
-                    if os.getenv("RASPI_DISPLAY", False).lower() in ["true", "1", "yes"]:
+                    if self._raspi_display:
                         if session_active_from_settings:
                             set_screen_cooldown(10800)  # 3 hours cooldown
                             turn_on_screen()
@@ -571,35 +878,47 @@ class PostureDetector(QObject):
 
                 # If no active session, just wait and check again
                 if not current_session_active:
-                    # Process events while waiting to ensure UI remains responsive
-                    QApplication.processEvents()
+                    if inference_queue is not None:
+                        self._stop_pipeline()
+                        inference_queue = None
+
+                    # Turn the webcam off while idle. Done on the camera thread, after any read still in flight
+                    if self.camera_manager.is_open():
+                        await loop.run_in_executor(self._camera_executor, self.camera_manager.release)
+
                     await asyncio.sleep(1)  # Check settings periodically
                     continue
 
-                # Read frame from webcam
-                success, frame = self.camera_manager.read_frame()
+                # Capture and pose detection run in their own tasks, overlapping with the processing below
+                if inference_queue is None:
+                    if not self.camera_manager.is_open():
+                        await loop.run_in_executor(self._camera_executor, self.camera_manager.initialize)
+                    inference_queue = self._start_pipeline()
+
+                item = await inference_queue.get()
 
-                if not success:
+                if item is None:
                     print("Error: Failed to capture image from webcam")
                     break
 
                 # Process the frame
-                processed_frame = await self.process_frame(frame)
-
-                # Also update the posture window's webcam feed when session is active
-                if current_session_active:
+                frame, result = item
+                processed_frame = await self.process_frame(frame, result)
+
+                # Also update the posture window's webcam feed when session is active, at most UI_MAX_FPS times
+                # per second: every frame is analyzed, but painting the preview is expensive on the Pi
+                now = time.monotonic()
+                if current_session_active and not self.headless and now >= self._next_ui_update:
+                    self._next_ui_update = now + 1 / UI_MAX_FPS
                     self.app_controller.posture_window.update_frame(
                         frame=processed_frame,
-                        landmarks=getattr(self, "_last_landmarks", {}),
-                        analysis_results=getattr(self, "_last_analysis_results", {}),
-                        colors=self.get_colors(3),
+                        landmarks=self._last_landmarks,
+                        analysis_results=self._last_analysis_results,
+                        colors=self._last_colors,
                     )
 
-                # Process Qt events to keep the UI responsive
-                QApplication.processEvents()
-
-                # Give other tasks a chance to run
-                await asyncio.sleep(0.01)
+                # Give other tasks and the Qt events a chance to run
+                await asyncio.sleep(0)
         except Exception as e:
             print(f"Error occurred: {str(e)}")
             raise e
@@ -12,7 +12,13 @@ from dotenv import load_dotenv
 from qasync import QApplication as QAsyncApplication
 from qasync import QEventLoop
 
-from config.settings import DEFAULT_CAMERA_HEIGHT, DEFAULT_CAMERA_WIDTH
+from config.settings import (
+    DEFAULT_CAMERA_HEIGHT,
+    DEFAULT_CAMERA_WIDTH,
+    DEFAULT_MODEL_COMPLEXITY,
+    INFER_EVERY_N_FRAMES,
+    INFERENCE_MAX_WIDTH,
+)
 from detector.posture_detector import PostureDetector
 from utils.camera import CameraManager
 from utils.visualization import MainAppController
@@ -22,6 +28,22 @@ from utils.websocket_client import WebSocketClient
 load_dotenv()
 
 
+def positive_int(value):
+    """Argparse type for integers greater than zero"""
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive integer")
+    return number
+
+
+def non_negative_int(value):
+    """Argparse type for integers greater than or equal to zero"""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"{value} is not a non-negative integer")
+    return number
+
+
 def parse_arguments():
     """Parse command line arguments"""
     parser = argparse.ArgumentParser(description="Posture Detection System")
@@ -39,6 +61,9 @@ def parse_arguments():
     )
     parser.add_argument("--camera", type=int, default=0, help="Camera index (default: 0)")
     parser.add_argument("--no-guidance", action="store_true", help="Disable posture correction guidance")
+    parser.add_argument(
+        "--headless", action="store_true", help="Don't draw the webcam preview (posture analysis keeps running)"
+    )
     parser.add_argument(
         "--rotate",
         type=int,
@@ -49,26 +74,36 @@ def parse_arguments():
     parser.add_argument(
         "--model",
         type=int,
-        default=2,
+        default=DEFAULT_MODEL_COMPLEXITY,
         choices=[0, 1, 2],
-        help="MediaPipe model complexity  (default: 2)",
+        help=(
+            "MediaPipe pose model complexity: 0 (lite), 1 (full) or 2 (heavy). Heavier models are slightly more "
+            "accurate but several times slower, 1 or 0 is recommended on a Raspberry Pi "
+            f"(default: {DEFAULT_MODEL_COMPLEXITY} on this machine)"
+        ),
+    )
+    parser.add_argument(
+        "--inference-width",
+        type=positive_int,
+        default=INFERENCE_MAX_WIDTH,
+        help=f"Downscale wider frames to this width before pose detection (default: {INFERENCE_MAX_WIDTH})",
+    )
+    parser.add_argument(
+        "--frame-skip",
+        type=non_negative_int,
+        default=INFER_EVERY_N_FRAMES - 1,
+        help=(
+            "Number of camera frames that reuse the last pose detection results before the model runs again "
+            f"(default: {INFER_EVERY_N_FRAMES - 1})"
+        ),
     )
 
     return parser.parse_args()
 
 
-async def main():
-    """Main function to run the posture detector"""
-    args = parse_arguments()
-
+async def run(args):
+    """Connect to the backend and run the posture detector until it stops"""
     try:
-        # Initialize Qt application with qasync integration
-        app = QAsyncApplication(sys.argv)
-        # set background color to black
-        app.setStyleSheet("QWidget { background-color: #000000; }")
-        loop = QEventLoop(app)
-        asyncio.set_event_loop(loop)
-
         # Initialize camera with specified dimensions
         camera_manager = CameraManager(
             camera_index=args.camera,
@@ -93,6 +128,9 @@ async def main():
                 camera_manager=camera_manager,
                 show_guidance=not args.no_guidance,
                 model_complexity=args.model,
+                inference_width=args.inference_width,
+                headless=args.headless,
+                infer_every=args.frame_skip + 1,
                 websocket_client=websocket_client,
                 app_controller=app_controller,
             )
@@ -119,8 +157,24 @@ async def main():
 
         traceback.print_exc()
 
+
+def main():
+    """Main function to run the posture detector"""
+    args = parse_arguments()
+
+    # Initialize Qt application with qasync integration: Qt events are processed
+    # by the asyncio event loop itself, between the detector's awaits
+    app = QAsyncApplication(sys.argv)
+    # set background color to black
+    app.setStyleSheet("QWidget { background-color: #000000; }")
+    loop = QEventLoop(app)
+    asyncio.set_event_loop(loop)
+
+    with loop:
+        loop.run_until_complete(run(args))
+
     return 0
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    sys.exit(main())
@@ -2,6 +2,7 @@
 Visualization utilities for the posture detector.
 """
 
+import functools
 import os
 
 import cv2
@@ -21,6 +22,7 @@ from PyQt6.QtWidgets import (
 from config.settings import BODY_COMPONENTS, COLORS, FONT_FACE, PANEL_OPACITY, PANEL_PADDING, TEXT_PADDING
 
 
+@functools.lru_cache(maxsize=8)
 def get_optimal_font_scale(frame_width):
     """
     Calculate optimal font scale based on frame width
@@ -44,19 +46,23 @@ def draw_landmarks(frame, landmarks, color=COLORS["yellow"]):
 
     Args:
         frame: Image frame to draw on
-        landmarks: Dictionary of landmark coordinates
+        landmarks: LandmarkSet with the landmark coordinates
         color: Color to use for drawing
     """
-    for name, value in landmarks.items():
-        # Only process coordinate pairs (x,y), skip metadata fields
-        if name in ["primary_ear", "l_ear_visibility", "r_ear_visibility"]:
-            continue
-
-        # Handle coordinate pairs
-        if isinstance(value, tuple) and len(value) == 2:
+    # Only the coordinate pairs (x,y), the remaining fields are metadata
+    points = (
+        landmarks.l_shoulder,
+        landmarks.r_shoulder,
+        landmarks.l_ear,
+        landmarks.r_ear,
+        landmarks.l_hip,
+        landmarks.r_hip,
+    )
+    radius = max(3, int(frame.shape[1] / 100))  # Scale circle radius to frame
+    for value in points:
+        if value is not None:
             x, y = value
             if x is not None and y is not None:
-                radius = max(3, int(frame.shape[1] / 100))  # Scale circle radius to frame
                 cv2.circle(frame, (x, y), radius, color, -1)
 
 
@@ -66,19 +72,19 @@ def draw_posture_lines(frame, landmarks, colors):
 
     Args:
         frame: Image frame to draw on
-        landmarks: Dictionary of landmark coordinates
+        landmarks: LandmarkSet with the landmark coordinates
         colors: Colors to use for drawing
     """
     # Extract coordinates
-    l_shldr = landmarks.get("l_shoulder", (None, None))
-    r_shldr = landmarks.get("r_shoulder", (None, None))
-    l_ear = landmarks.get("l_ear", (None, None))
-    r_ear = landmarks.get("r_ear", (None, None))
-    l_hip = landmarks.get("l_hip", (None, None))
-    r_hip = landmarks.get("r_hip", (None, None))
+    l_shldr = landmarks.l_shoulder or (None, None)
+    r_shldr = landmarks.r_shoulder or (None, None)
+    l_ear = landmarks.l_ear or (None, None)
+    r_ear = landmarks.r_ear or (None, None)
+    l_hip = landmarks.l_hip or (None, None)
+    r_hip = landmarks.r_hip or (None, None)
 
     # Get the primary ear (more visible) for drawing lines
-    primary_ear = landmarks.get("primary_ear", "left")
+    primary_ear = landmarks.primary_ear
 
     # Set line thickness based on frame size
     thickness = max(2, int(frame.shape[1] / 320))
@@ -154,7 +160,7 @@ def draw_angle_text(frame, landmarks, neck_angle, torso_angle, color):
 
     Args:
         frame: Image frame to draw on
-        landmarks: Dictionary of landmark coordinates
+        landmarks: LandmarkSet with the landmark coordinates
         neck_angle: Calculated neck angle
         torso_angle: Calculated torso angle
         color: Color to use for drawing
@@ -164,22 +170,22 @@ def draw_angle_text(frame, landmarks, neck_angle, torso_angle, color):
     thickness = max(1, int(w / 640))
 
     # Get the primary ear (more visible) for text positioning
-    primary_ear = landmarks.get("primary_ear", "left")
+    primary_ear = landmarks.primary_ear
 
     # Choose which side to use for visualization based on visibility
     if primary_ear == "left":
-        shoulder = landmarks.get("l_shoulder")
-        hip = landmarks.get("l_hip")
+        shoulder = landmarks.l_shoulder
+        hip = landmarks.l_hip
     else:
-        shoulder = landmarks.get("r_shoulder")
-        hip = landmarks.get("r_hip")
+        shoulder = landmarks.r_shoulder
+        hip = landmarks.r_hip
 
     # If preferred side isn't available, try the other side
     if shoulder is None:
-        shoulder = landmarks.get("r_shoulder" if primary_ear == "left" else "l_shoulder")
+        shoulder = landmarks.r_shoulder if primary_ear == "left" else landmarks.l_shoulder
 
     if hip is None:
-        hip = landmarks.get("r_hip" if primary_ear == "left" else "l_hip")
+        hip = landmarks.r_hip if primary_ear == "left" else landmarks.l_hip
 
     # Display angles next to landmarks with proper positioning
     if shoulder is not None and all(x is not None for x in shoulder):
@@ -208,7 +214,7 @@ def draw_angle_text(frame, landmarks, neck_angle, torso_angle, color):
         )
 
     # Display relative angle if head is tilted back
-    is_head_tilted_back = landmarks.get("is_head_tilted_back", False)
+    is_head_tilted_back = landmarks.is_head_tilted_back
 
     if is_head_tilted_back and shoulder is not None and hip is not None:
         relative_angle = abs(neck_angle - torso_angle)
@@ -232,14 +238,14 @@ def draw_posture_guidance(frame, analysis_results):
 
     Args:
         frame: Image frame to draw on
-        analysis_results: Dictionary containing posture analysis results
+        analysis_results: PostureResult of the current frame
     """
     h, w = frame.shape[:2]
     font_scale = get_optimal_font_scale(w)
     thickness = max(1, int(w / 640))
 
     # Extract posture issues
-    issues = analysis_results.get("issues", [])
+    issues = analysis_results.issues
     if not issues:
         return frame
 
@@ -254,15 +260,19 @@ def draw_posture_guidance(frame, analysis_results):
     panel_y1 = PANEL_PADDING
     panel_y2 = min(h - PANEL_PADDING, panel_height + PANEL_PADDING)
 
-    overlay = frame.copy()
-    cv2.rectangle(overlay, (panel_x1, panel_y1), (panel_x2, panel_y2), COLORS["dark_blue"], -1)
+    # Only the area right of the panel's left edge, down to just below the panel, is copied and blended:
+    # the rest of the overlay would be identical to the frame
+    roi_y2 = min(h, panel_y2 + PANEL_PADDING)
+    roi = frame[:roi_y2, panel_x1:]
+    overlay = roi.copy()
+    cv2.rectangle(overlay, (0, panel_y1), (panel_x2 - panel_x1, panel_y2), COLORS["dark_blue"], -1)
 
     # Add title
     title_y = panel_y1 + PANEL_PADDING + int(20 * font_scale)
     cv2.putText(
         overlay,
         "Posture Correction Guide:",
-        (panel_x1 + TEXT_PADDING, title_y),
+        (TEXT_PADDING, title_y),
         FONT_FACE,
         font_scale,
         COLORS["white"],
@@ -277,15 +287,15 @@ def draw_posture_guidance(frame, analysis_results):
         cv2.putText(
             overlay,
             f"• {correction}",
-            (panel_x1 + TEXT_PADDING, y_pos),
+            (TEXT_PADDING, y_pos),
             FONT_FACE,
             font_scale * 0.9,
             COLORS["white"],
             thickness,
         )
 
-    # Apply the overlay with transparency
-    cv2.addWeighted(overlay, PANEL_OPACITY, frame, 1 - PANEL_OPACITY, 0, frame)
+    # Apply the overlay with transparency, in place on the frame
+    cv2.addWeighted(overlay, PANEL_OPACITY, roi, 1 - PANEL_OPACITY, 0, roi)
 
     return frame
 
@@ -296,13 +306,13 @@ def draw_status_bar(frame, analysis_results):
 
     Args:
         frame: Image frame to draw on
-        analysis_results: Dictionary containing posture analysis results
+        analysis_results: PostureResult of the current frame
     """
     h, w = frame.shape[:2]
     font_scale = get_optimal_font_scale(w)
     thickness = max(1, int(w / 640))
 
-    is_head_tilted_back = analysis_results.get("is_head_tilted_back", False)
+    is_head_tilted_back = analysis_results.is_head_tilted_back
 
     # Scale status bar height based on frame size
     status_height = int(h / 12)
@@ -314,7 +324,7 @@ def draw_status_bar(frame, analysis_results):
     y_pos = h - int(status_height / 2)
 
     # Display webcam position at the bottom-center
-    webcam_pos = analysis_results.get("webcam_position", "unknown")
+    webcam_pos = analysis_results.webcam_position
 
     # Create status text with head tilt information
     status_text = "HEAD BACK" if is_head_tilted_back else ""
@@ -599,7 +609,7 @@ class PostureWindow(QWidget):
 
         # Current frame and analysis data
         self.current_frame = None
-        self.landmarks = {}
+        self.landmarks = None
 
         # todo non serve a niente
         # self.analysis_results = {}
@@ -617,8 +627,8 @@ class PostureWindow(QWidget):
 
         Args:
             frame: The video frame (numpy array)
-            landmarks: Dictionary of detected landmarks
-            analysis_results: Dictionary of posture analysis results
+            landmarks: LandmarkSet of detected landmarks
+            analysis_results: PostureResult of the last analyzed frame
         """
         if frame is None:
             return
@@ -626,36 +636,32 @@ class PostureWindow(QWidget):
         # Store data for visualization
         self.current_frame = frame.copy()
 
-        if landmarks:
+        if landmarks is not None:
             self.landmarks = landmarks
 
         # Draw posture visualization on the frame
-        if self.landmarks:
+        if self.landmarks is not None:
             # Draw landmarks
             draw_landmarks(self.current_frame, self.landmarks)
 
             # Draw posture lines with appropriate colors
             draw_posture_lines(self.current_frame, self.landmarks, colors)
 
-            # Draw angles if available in the results
-            if "neck_angle" in analysis_results and "torso_angle" in analysis_results:
-                draw_angle_text(
-                    self.current_frame,
-                    self.landmarks,
-                    analysis_results["neck_angle"],
-                    analysis_results["torso_angle"],
-                    COLORS["white"],
-                )
-
-            # Draw posture guidance
-            if "issues" in analysis_results:
+            if analysis_results is not None:
+                # Draw angles if available in the results
+                if analysis_results.neck_angle is not None and analysis_results.torso_angle is not None:
+                    draw_angle_text(
+                        self.current_frame,
+                        self.landmarks,
+                        analysis_results.neck_angle,
+                        analysis_results.torso_angle,
+                        COLORS["white"],
+                    )
+
+                # Draw posture guidance
                 draw_posture_guidance(self.current_frame, analysis_results)
 
-            # Draw status indicators
-            if "is_good_posture" in analysis_results:
-                draw_posture_indicator(self.current_frame, analysis_results["is_good_posture"])
-
-            draw_status_bar(self.current_frame, analysis_results)
+                draw_status_bar(self.current_frame, analysis_results)
 
         # Convert to Qt format and display
         self._display_frame()
@@ -665,13 +671,10 @@ class PostureWindow(QWidget):
         if self.current_frame is None:
             return
 
-        # Convert the frame to RGB (from BGR)
-        rgb_frame = cv2.cvtColor(self.current_frame, cv2.COLOR_BGR2RGB)
-
-        # Create QImage from the frame
-        h, w, ch = rgb_frame.shape
+        # Create QImage straight from the BGR frame, Qt converts it while building the pixmap
+        h, w, ch = self.current_frame.shape
         bytes_per_line = ch * w
-        qt_image = QImage(rgb_frame.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
+        qt_image = QImage(self.current_frame.data, w, h, bytes_per_line, QImage.Format.Format_BGR888)
 
         # Scale the image to fit while maintaining original aspect ratio
         pixmap = QPixmap.fromImage(qt_image)
@@ -726,23 +729,23 @@ class PostureWindow(QWidget):
 
         # Update scores and status widgets
         if scores := results.get("scores"):
-            self.torso_widget.progress.setValue(scores.get(BODY_COMPONENTS["torso"]["score"], 0))
-            self.shoulders_widget.progress.setValue(scores.get(BODY_COMPONENTS["shoulders"]["score"], 0))
-            self.neck_widget.progress.setValue(scores.get(BODY_COMPONENTS["neck"]["score"], 0))
+            self.torso_widget.progress.setValue(scores.get(BODY_COMPONENTS["torso"].score, 0))
+            self.shoulders_widget.progress.setValue(scores.get(BODY_COMPONENTS["shoulders"].score, 0))
+            self.neck_widget.progress.setValue(scores.get(BODY_COMPONENTS["neck"].score, 0))
 
             # Update the icon based on scores
             # self.update_icon_image(scores)
 
             self.update_progress_style(
-                self.torso_widget.progress, scores.get(BODY_COMPONENTS["torso"]["score"], 0), colors["torso"]
+                self.torso_widget.progress, scores.get(BODY_COMPONENTS["torso"].score, 0), colors["torso"]
             )
             self.update_progress_style(
                 self.shoulders_widget.progress,
-                scores.get(BODY_COMPONENTS["shoulders"]["score"], 0),
+                scores.get(BODY_COMPONENTS["shoulders"].score, 0),
                 colors["shoulders"],
             )
             self.update_progress_style(
-                self.neck_widget.progress, scores.get(BODY_COMPONENTS["neck"]["score"], 0), colors["neck"]
+                self.neck_widget.progress, scores.get(BODY_COMPONENTS["neck"].score, 0), colors["neck"]
             )
 
         if issues := results.get("issues"):